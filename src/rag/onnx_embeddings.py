@@ -0,0 +1,93 @@
+"""
+ONNX Runtime embeddings for the RAG service.
+Runs an int8 dynamically-quantized export of the embedding model on CPU.
+
+Requires onnxruntime, which is optional and not in requirements.txt: pip install onnxruntime==1.20.1
+
+One-time setup (the model repo publishes an ONNX export of its custom nomic_bert architecture):
+    huggingface-cli download nomic-ai/nomic-embed-text-v1.5 onnx/model.onnx config.json tokenizer.json \
+        tokenizer_config.json special_tokens_map.json vocab.txt --local-dir rag_onnx
+    python -m rag.onnx_embeddings rag_onnx/
+Then set RAG_ONNX_MODEL_DIR=rag_onnx in Backend/.env to use it.
+"""
+import os
+import sys
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Paths inside the model directory, following the layout of the model repo
+ONNX_MODEL_FILE = os.path.join("onnx", "model.onnx")
+QUANTIZED_MODEL_FILE = os.path.join("onnx", "model.int8.onnx")
+
+def quantize_model(model_dir: str) -> str:
+    """
+    Quantizes the onnx/model.onnx weights to int8 and writes onnx/model.int8.onnx next to it.
+    Returns the path of the quantized model.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+    target_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QInt8)
+    return target_path
+
+class OnnxEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by an int8 ONNX model.
+    Mean-pools the token embeddings and L2-normalizes them, matching the
+    sentence-transformers output used with normalize_embeddings=True.
+    """
+
+    def __init__(self, model_dir: str, batch_size: int = 64, max_length: int = 8192):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, QUANTIZED_MODEL_FILE),
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            input_ids = encoded["input_ids"].astype(np.int64)
+            inputs = {}
+            for name in self._input_names:
+                if name in encoded:
+                    inputs[name] = encoded[name].astype(np.int64)
+                elif name == "token_type_ids":
+                    inputs[name] = np.zeros_like(input_ids)
+
+            token_embeddings = self.session.run(None, inputs)[0]
+
+            # Mean pooling over real tokens, then L2 normalization
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m rag.onnx_embeddings <downloaded_model_dir>")
+        sys.exit(1)
+    print(f"✅ Quantized model written to {quantize_model(sys.argv[1])}")
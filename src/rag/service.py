@@ -4,42 +4,511 @@ This service provides RAG functionality for answering questions about project co
 """
 import os
 import json
+import logging
 import sys
-from typing import Dict, List, Optional
+import hashlib
+import math
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 from dotenv import load_dotenv
+import faiss
+import numpy as np
+import torch
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used when missing
+    orjson = None
 
 # LangChain components
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .onnx_embeddings import OnnxEmbeddings
 
 # Configuration
 # DB_DIR is relative to Backend root
 # __file__ is Backend/src/rag/service.py, so we go up 2 levels to get Backend/
 _backend_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DB_DIR = os.path.join(_backend_root, "rag_db")
+# Chunk embeddings keyed by SHA-256 of the text (per model), shared by all projects and rebuilds
+EMBEDDING_CACHE_DIR = os.path.join(DB_DIR, "embed_cache")
 EMBEDDING_MODEL = "nomic-ai/nomic-embed-text-v1.5"
 OPENROUTER_MODEL = "google/gemini-2.5-flash"
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_BATCH_SIZE_GPU = 128
+
+# Module detail chunks longer than this are split on story/line boundaries with 25% overlap
+# (sizes in characters, ~512 tokens at the 4 characters/token estimate used in debug output)
+MODULE_CHUNK_SIZE = 2048
+MODULE_CHUNK_OVERLAP = 512
+
+# HNSW index settings (embeddings are L2-normalized, so inner product == cosine similarity).
+# Vectors are stored as 8-bit scalar-quantized codes: 4x less memory than float32, negligible recall loss.
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 16
+
+# Projects with more chunks than this use an IVF index over 8-bit scalar-quantized vectors
+# (same codes as the HNSW index; up to sqrt(N) Voronoi cells, keeping >= 39 training points per cell)
+IVF_MIN_CHUNKS = 500
+IVF_MIN_POINTS_PER_LIST = 39
+IVF_NPROBE = 4
+
+# Bumped when the index layout changes, so saved indexes of the old layout are rebuilt
+INDEX_VERSION = 3
+# Each build is saved into its own directory (named by the manifest), never rewritten in place
+INDEX_DIR_PREFIX = "index-"
+
+# Number of chunks retrieved per question: Maximal Marginal Relevance picks RETRIEVER_K diverse chunks
+# out of the RETRIEVER_FETCH_K nearest ones (lambda 1.0 = pure relevance, 0.0 = pure diversity)
+RETRIEVER_K = 3
+RETRIEVER_FETCH_K = 30
+RETRIEVER_LAMBDA_MULT = 0.5
+QUERY_EMBEDDING_CACHE_SIZE = 256
+
+# Answer cache: exact question match first, then cosine similarity over previous question embeddings
+ANSWER_CACHE_SIZE = 512
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.97
+
+# Simple listing/count questions answered directly from project data (no retrieval, no LLM call).
+# The first template of each group is also seeded into the semantic cache to catch rephrasings.
+QUICK_LIST_QUESTIONS = (
+    "list all {}", "list all the {}", "list the {}", "list {}", "what are the {}",
+    "what are all the {}", "show all {}", "show me all {}", "show me all the {}"
+)
+QUICK_COUNT_QUESTIONS = (
+    "how many {}", "how many {} are there", "how many {} does the project have",
+    "how many {} are in this project", "how many {} are in the project", "number of {}",
+    "total number of {}"
+)
+QUICK_PROJECT_NAME_QUESTIONS = (
+    "what is the project name", "what is the name of the project", "what is the project called",
+    "what is this project called", "project name"
+)
+
+# The instructions are a fixed system message and the per-question context comes last,
+# so the prompt prefix is identical across queries and can hit provider-side prompt caching
+RAG_SYSTEM_PROMPT = """You are an expert project assistant for a software development team. 
+Answer the user's question based on the project context provided with the question.
+
+IMPORTANT INSTRUCTIONS:
+- If asked to list ALL modules or module names, look for the "MODULE LIST OVERVIEW" or "ALL MODULES IN THIS PROJECT" section
+- When you see "Total Modules: X", ensure your answer includes exactly X modules
+- For listing questions, use the dedicated list chunks that contain complete lists
+- If asked for details about a specific module, use the individual module chunks
+- Always provide the COMPLETE list when asked for "all" items
+- If the context contains a "Quick List of Module Names" section, use it for module name questions
+- Distinguish between "Global Business Rules" (project-level) and feature-specific business rules
+- When discussing business rules, mention which modules they apply to if specified"""
+
+RAG_USER_TEMPLATE = """<context>
+{context}
+</context>
+
+Question: {question}
+
+Answer:"""
+
+# Parsed once at import; prompt templates and the output parser are stateless and shared by every chain
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", RAG_SYSTEM_PROMPT),
+    ("user", RAG_USER_TEMPLATE)
+])
+_OUTPUT_PARSER = StrOutputParser()
 
 # Debug mode - set to True to see retrieved chunks
 DEBUG_MODE = os.getenv("RAG_DEBUG", "true").lower() == "true"
 
+# Debug output is logged at DEBUG level with lazy formatting, so it costs nothing when debug mode is off
+logger = logging.getLogger("rag")
+logger.setLevel(logging.DEBUG if DEBUG_MODE else logging.INFO)
+if not logger.handlers:
+    _log_handler = logging.StreamHandler(sys.stdout)
+    _log_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+
 # Global variables for caching
-_vector_store = None
-_rag_chain = None
 _embeddings = None
-_current_project_id = None
+_query_embeddings = None
+_document_embeddings = None
+_embeddings_lock = threading.Lock()
+# The RAG chain takes the formatted context as input, so one chain (and LLM client) serves every project
+_rag_chain = None
+_rag_chain_lock = threading.Lock()
+
+class _ProjectState(NamedTuple):
+    """Loaded vector store, retriever, RAG chain and quick answers for one project."""
+    vector_store: FAISS
+    retriever: Any
+    rag_chain: Any
+    project_hash: str
+    quick_answers: Dict[str, str]
+
+# Loaded projects in LRU order (most recently used last); evicted projects reload their saved index on demand
+MAX_LOADED_PROJECTS = int(os.getenv("RAG_MAX_LOADED_PROJECTS", "8"))
+_projects: "OrderedDict[str, _ProjectState]" = OrderedDict()
+_projects_lock = threading.Lock()
+
+# Chunks built per project data hash, so re-initializing an unchanged project skips chunk building
+CHUNK_CACHE_SIZE = 32
+_chunk_cache: "OrderedDict[str, List[Document]]" = OrderedDict()
+# Written next to each saved index: the project data hash and embedding model it was built from
+MANIFEST_FILE = "manifest.json"
+
+# Answers keyed by (project_id, project_hash, normalized question), plus per-project question indexes
+_answer_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_question_indexes: Dict[str, "_QuestionIndex"] = {}
+_answer_cache_lock = threading.Lock()
+
+def _project_hash(project_data: Dict) -> str:
+    """
+    Returns a stable hash of the project data.
+    Used to key the in-process chunk cache and the on-disk vector store.
+    """
+    payload = json.dumps(project_data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def _get_document_chunks(project_hash: str, project_data: Dict) -> List[Document]:
+    """
+    Returns document chunks for the project data, reusing cached chunks when the data is unchanged.
+    """
+    documents = _chunk_cache.get(project_hash)
+    if documents is not None:
+        _chunk_cache.move_to_end(project_hash)
+        return documents
+    
+    documents = create_document_chunks(project_data)
+    _chunk_cache[project_hash] = documents
+    if len(_chunk_cache) > CHUNK_CACHE_SIZE:
+        _chunk_cache.popitem(last=False)
+    return documents
+
+def _embedding_model_id(embeddings: Optional[Embeddings] = None) -> str:
+    """
+    Identifies the embedding model, so indexes and cached vectors from another model are not reused.
+    Reduced-precision GPU encodes get their own id, so they never mix with fp32 CPU vectors.
+    The id is free text for the manifest; cache keys use _embedding_cache_namespace instead.
+    """
+    embeddings = embeddings or _embeddings
+    if isinstance(embeddings, OnnxEmbeddings):
+        return f"{EMBEDDING_MODEL} (onnx int8)"
+    if isinstance(embeddings, HuggingFaceEmbeddings) and embeddings.model_kwargs.get('device') == 'cuda':
+        dtype = embeddings.model_kwargs.get('model_kwargs', {}).get('torch_dtype', torch.float32)
+        return f"{EMBEDDING_MODEL} (cuda {str(dtype).replace('torch.', '')})"
+    return EMBEDDING_MODEL
+
+def _embedding_cache_namespace(embeddings: Optional[Embeddings] = None) -> str:
+    """
+    Key prefix for the model's vectors in the persistent embedding cache. LocalFileStore only accepts
+    [A-Za-z0-9_.-/] in keys; the trailing '/' gives each model its own directory.
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", _embedding_model_id(embeddings)) + "/"
+
+def _read_manifest(db_path: str) -> Optional[Dict]:
+    """Returns the manifest of the saved vector store, if any."""
+    try:
+        with open(os.path.join(db_path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(db_path: str, project_hash: str, n_chunks: int, quick_answers: Dict[str, str],
+                    index_dir: str) -> None:
+    manifest = {
+        "hash": project_hash,
+        "model": _embedding_model_id(),
+        "index_version": INDEX_VERSION,
+        "index_dir": index_dir,
+        "n_chunks": n_chunks,
+        "quick_answers": quick_answers
+    }
+    # Written to a temp file and swapped in, so other workers never read a half-written manifest
+    tmp_path = os.path.join(db_path, f".{MANIFEST_FILE}.{uuid.uuid4().hex}")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(db_path, MANIFEST_FILE))
+
+def _has_saved_index(db_path: str, manifest: Optional[Dict], project_hash: Optional[str] = None) -> bool:
+    """
+    Checks that a saved index exists and was built with the loaded embedding model and current index layout
+    (and from the given project data, if a hash is passed).
+    """
+    return (
+        manifest is not None
+        and manifest.get("model") == _embedding_model_id()
+        and manifest.get("index_version") == INDEX_VERSION
+        and (project_hash is None or manifest.get("hash") == project_hash)
+        and os.path.exists(os.path.join(db_path, manifest["index_dir"], "index.faiss"))
+    )
+
+class _QueryCachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model and memoizes embed_query results (LRU),
+    so a repeated question is only encoded once.
+    """
+    
+    def __init__(self, underlying: Embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.underlying = underlying
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Queries arrive from threadpool workers concurrently; the encode itself runs outside the lock
+        self._lock = threading.Lock()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                return vector
+        
+        vector = self.underlying.embed_query(text)
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return vector
+
+class _QuestionIndex:
+    """
+    FAISS inner-product index over embeddings of previously answered questions for one project.
+    Question embeddings are normalized, so the score is the cosine similarity.
+    """
+    
+    def __init__(self, project_hash: str, dim: int, capacity: int = SEMANTIC_CACHE_SIZE):
+        self.project_hash = project_hash
+        self.capacity = capacity
+        self.index = faiss.IndexFlatIP(dim)
+        self.answers: List[str] = []
+    
+    def search(self, vector: List[float]) -> Optional[str]:
+        if not self.answers:
+            return None
+        scores, ids = self.index.search(np.asarray([vector], dtype='float32'), 1)
+        if ids[0][0] >= 0 and scores[0][0] >= SEMANTIC_CACHE_THRESHOLD:
+            return self.answers[ids[0][0]]
+        return None
+    
+    def add(self, vector: List[float], answer: str) -> None:
+        self.index.add(np.asarray([vector], dtype='float32'))
+        self.answers.append(answer)
+        if len(self.answers) > self.capacity:
+            # Drop the oldest entry; remove_ids compacts the remaining ids to match the list
+            self.index.remove_ids(np.arange(1, dtype='int64'))
+            self.answers.pop(0)
+
+def _normalize_question(question: str) -> str:
+    """Lowercases a question and drops trailing punctuation and repeated whitespace."""
+    return " ".join(question.strip().lower().rstrip("?!. ").split())
+
+def _build_quick_answers(project_data: Dict) -> Dict[str, str]:
+    """
+    Precomputes deterministic answers for simple listing/count questions, keyed by normalized question.
+    """
+    quick_answers = {}
+    entities = (
+        ("modules", project_data.get("modules", []), 'module_name', 'Unnamed'),
+        ("user stories", project_data.get("user_stories", []), 'title', 'Unnamed Story'),
+        ("features", project_data.get("features", []), 'title', 'Unnamed Feature'),
+    )
+    for label, items, name_key, default_name in entities:
+        count_answer = f"Total number of {label}: {len(items)}"
+        for template in QUICK_COUNT_QUESTIONS:
+            quick_answers[template.format(label)] = count_answer
+        
+        if items:
+            names = "\n".join(f"{i}. {item.get(name_key, default_name)}" for i, item in enumerate(items, 1))
+            list_answer = f"All {label} in this project ({len(items)} total):\n{names}"
+            for template in QUICK_LIST_QUESTIONS:
+                quick_answers[template.format(label)] = list_answer
+    
+    project_name = (project_data.get("project") or {}).get("name")
+    if project_name:
+        for question in QUICK_PROJECT_NAME_QUESTIONS:
+            quick_answers[question] = f"The project name is {project_name}."
+    
+    return quick_answers
+
+def _seed_similar_answers(project_id: str, project_hash: str, quick_answers: Dict[str, str]) -> None:
+    """
+    Seeds the project's semantic cache with the canonical quick-answer questions,
+    so close rephrasings are answered without retrieval or an LLM call.
+    """
+    seed_templates = (QUICK_LIST_QUESTIONS[0], QUICK_COUNT_QUESTIONS[0])
+    questions = [
+        template.format(label)
+        for label in ("modules", "user stories", "features")
+        for template in seed_templates
+    ] + [QUICK_PROJECT_NAME_QUESTIONS[0]]
+    questions = [q for q in questions if q in quick_answers]
+    
+    with _answer_cache_lock:
+        question_index = _question_indexes.get(project_id)
+        if not questions or (question_index is not None and question_index.project_hash == project_hash):
+            return  # Nothing to seed, or already seeded for this project data
+    
+    vectors = _document_embeddings.embed_documents(questions)
+    question_index = _QuestionIndex(project_hash, len(vectors[0]))
+    for question, vector in zip(questions, vectors):
+        question_index.add(vector, quick_answers[question])
+    
+    with _answer_cache_lock:
+        _question_indexes[project_id] = question_index
+
+def _get_cached_answer(project_id: str, project_hash: str, question: str) -> Optional[str]:
+    """Returns a cached answer for an identical question, if any."""
+    key = (project_id, project_hash, _normalize_question(question))
+    with _answer_cache_lock:
+        answer = _answer_cache.get(key)
+        if answer is not None:
+            _answer_cache.move_to_end(key)
+        return answer
+
+def _get_similar_answer(project_id: str, project_hash: str, question_vector: List[float]) -> Optional[str]:
+    """Returns the cached answer of a previously asked, near-identical question, if any."""
+    with _answer_cache_lock:
+        question_index = _question_indexes.get(project_id)
+        if question_index is None or question_index.project_hash != project_hash:
+            return None
+        return question_index.search(question_vector)
+
+def _cache_answer(project_id: str, project_hash: str, question: str,
+                  question_vector: List[float], answer: str) -> None:
+    """Stores an answer in both the exact and the semantic cache."""
+    key = (project_id, project_hash, _normalize_question(question))
+    with _answer_cache_lock:
+        _answer_cache[key] = answer
+        _answer_cache.move_to_end(key)
+        if len(_answer_cache) > ANSWER_CACHE_SIZE:
+            _answer_cache.popitem(last=False)
+        
+        question_index = _question_indexes.get(project_id)
+        if question_index is None or question_index.project_hash != project_hash:
+            # Project data changed (or first question): start a fresh index
+            question_index = _QuestionIndex(project_hash, len(question_vector))
+            _question_indexes[project_id] = question_index
+        question_index.add(question_vector, answer)
+
+_DOC_SEP = "\n\n---\n\n"
+
+def _format_docs(docs: List[Document]) -> str:
+    """Formats retrieved chunks into the context block sent to the LLM."""
+    return _DOC_SEP.join(d.page_content for d in docs)
+
+def _json_preview(value, limit: int) -> str:
+    """Returns value as indented JSON, truncated to about `limit` characters (for debug output)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2)[:limit].decode("utf-8", "ignore")
+        except TypeError:
+            pass  # e.g. non-string keys; fall back to stdlib json
+    return json.dumps(value, indent=2, default=str)[:limit]
+
+def _format_title_list(items: List[Dict], default_title: str) -> str:
+    """Formats numbered title lines (with priority and status) for the stories/features list chunks."""
+    return "\n".join(
+        f"{i}. {item.get('title', default_title)} (Priority: {item.get('priority', 'N/A')}, Status: {item.get('status', 'N/A')})"
+        for i, item in enumerate(items, 1)
+    )
+
+def _format_story(story: Dict, story_features) -> str:
+    """Formats one user story and its features for a module detail chunk."""
+    story_text = (
+        f"\n  • {story.get('title', 'N/A')}\n"
+        f"    Role: {story.get('user_role', 'N/A')}\n"
+        f"    Description: {story.get('description', 'N/A')}\n"
+        f"    Priority: {story.get('priority', 'N/A')}, Status: {story.get('status', 'N/A')}\n"
+    )
+    if not story_features:
+        return story_text
+    
+    feature_lines = "".join([
+        f"      - {f.get('title', 'N/A')} (Priority: {f.get('priority', 'N/A')}, Status: {f.get('status', 'N/A')})\n"
+        for f in story_features
+    ])
+    return f"{story_text}    Features:\n{feature_lines}"
+
+def _build_module_document(module: Dict, module_stories, features_by_story: Dict) -> Document:
+    """Builds the detail chunk for one module with its user stories and their features."""
+    module_id = module.get('id')
+    module_name = module.get('module_name', 'Unnamed Module')
+    
+    header = (
+        f"Module: {module_name}\n"
+        f"Description: {module.get('description', 'N/A')}\n"
+        f"Priority: {module.get('priority', 'N/A')}\n"
+        f"Business Impact: {module.get('business_impact', 'N/A')}\n\n"
+    )
+    
+    if module_stories:
+        stories_text = "".join([
+            _format_story(story, features_by_story.get(story.get('id'), ()))
+            for story in module_stories
+        ])
+        body = f"User Stories ({len(module_stories)} total):\n{stories_text}"
+    else:
+        body = "User Stories: None defined yet\n"
+    
+    return Document(
+        page_content=header + body,
+        metadata={"source": "Module Detail", "module_name": module_name, "module_id": module_id}
+    )
+
+_module_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=MODULE_CHUNK_SIZE,
+    chunk_overlap=MODULE_CHUNK_OVERLAP,
+    separators=["\n\n", "\n", ". ", " "]
+)
+
+def _split_module_document(document: Document) -> List[Document]:
+    """
+    Splits an oversized module chunk into overlapping parts, so each story stays retrievable on its own.
+    Every part keeps the module metadata; continuation parts are prefixed with the module name.
+    """
+    if len(document.page_content) <= MODULE_CHUNK_SIZE:
+        return [document]
+    
+    module_name = document.metadata["module_name"]
+    return [
+        Document(
+            page_content=text if i == 1 else f"Module: {module_name} (continued)\n{text}",
+            metadata={**document.metadata, "part": i}
+        )
+        for i, text in enumerate(_module_splitter.split_text(document.page_content), 1)
+    ]
+
+def _build_module_parts(module: Dict, module_stories, features_by_story: Dict) -> List[Document]:
+    """Builds one module's detail chunk and splits it when large."""
+    return _split_module_document(_build_module_document(module, module_stories, features_by_story))
 
 def create_document_chunks(project_data: Dict) -> List[Document]:
     """
     Creates optimized document chunks from project data.
     Strategy: 
     - One chunk for module names list
-    - One chunk per module with its user stories and features
+    - One chunk per module with its user stories and features (split into overlapping parts when large)
     - Separate chunks for project overview, tech stack, UI/UX, business rules
     """
     documents = []
@@ -48,29 +517,31 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
     modules = project_data.get("modules", [])
     if modules:
         # Create a focused chunk that will match "list all modules" queries
-        module_list = "ALL MODULES IN THIS PROJECT - COMPLETE LIST OF MODULE NAMES:\n\n"
-        module_list += "This is the complete list of all modules in the project.\n"
-        module_list += f"Total number of modules: {len(modules)}\n\n"
-        module_list += "MODULE NAMES AND DESCRIPTIONS:\n"
-        
-        # List all module names first for quick reference
-        module_list += "\nQuick List of Module Names:\n"
-        module_names = [m.get('module_name', 'Unnamed') for m in modules]
-        module_list += f"• {', '.join(module_names)}\n\n"
-        
-        # Then detailed list with descriptions
-        module_list += "Detailed Module List:\n"
-        for i, module in enumerate(modules, 1):
-            module_list += f"\n{i}. MODULE NAME: {module.get('module_name', 'Unnamed')}\n"
-            module_list += f"   Description: {module.get('description', 'No description available')}\n"
-            module_list += f"   Priority: {module.get('priority', 'Not specified')}\n"
-        
-        module_list += f"\n===== END OF MODULE LIST =====\n"
-        module_list += f"Total Modules in Project: {len(modules)}\n"
-        module_list += "Note: For detailed information about any module including user stories and features, refer to individual module chunks."
+        # List all module names first for quick reference, then detailed list with descriptions
+        module_names = ", ".join(m.get('module_name', 'Unnamed') for m in modules)
+        header = (
+            "ALL MODULES IN THIS PROJECT - COMPLETE LIST OF MODULE NAMES:\n\n"
+            "This is the complete list of all modules in the project.\n"
+            f"Total number of modules: {len(modules)}\n\n"
+            "MODULE NAMES AND DESCRIPTIONS:\n"
+            "\nQuick List of Module Names:\n"
+            f"• {module_names}\n\n"
+            "Detailed Module List:\n"
+        )
+        module_details = "\n\n".join(
+            f"{i}. MODULE NAME: {module.get('module_name', 'Unnamed')}\n"
+            f"   Description: {module.get('description', 'No description available')}\n"
+            f"   Priority: {module.get('priority', 'Not specified')}"
+            for i, module in enumerate(modules, 1)
+        )
+        footer = (
+            "\n===== END OF MODULE LIST =====\n"
+            f"Total Modules in Project: {len(modules)}\n"
+            "Note: For detailed information about any module including user stories and features, refer to individual module chunks."
+        )
         
         documents.append(Document(
-            page_content=module_list,
+            page_content="\n".join([header, module_details, footer]),
             metadata={
                 "source": "Module List Overview", 
                 "type": "module_list",
@@ -82,16 +553,18 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
     # 2. User Stories List (Names Only - Quick Reference)
     user_stories = project_data.get("user_stories", [])
     if user_stories:
-        stories_list = "ALL USER STORIES IN THIS PROJECT - COMPLETE LIST:\n\n"
-        stories_list += f"Total number of user stories: {len(user_stories)}\n\n"
-        stories_list += "USER STORY TITLES:\n"
-        for i, story in enumerate(user_stories, 1):
-            stories_list += f"{i}. {story.get('title', 'Unnamed Story')} (Priority: {story.get('priority', 'N/A')}, Status: {story.get('status', 'N/A')})\n"
-        stories_list += f"\n===== END OF USER STORIES LIST =====\n"
-        stories_list += f"Total User Stories: {len(user_stories)}\n"
+        header = (
+            "ALL USER STORIES IN THIS PROJECT - COMPLETE LIST:\n\n"
+            f"Total number of user stories: {len(user_stories)}\n\n"
+            "USER STORY TITLES:"
+        )
+        footer = (
+            "\n===== END OF USER STORIES LIST =====\n"
+            f"Total User Stories: {len(user_stories)}\n"
+        )
         
         documents.append(Document(
-            page_content=stories_list,
+            page_content="\n".join([header, _format_title_list(user_stories, 'Unnamed Story'), footer]),
             metadata={
                 "source": "User Stories List",
                 "type": "stories_list",
@@ -103,16 +576,18 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
     # 3. Features List (Names Only - Quick Reference)
     features = project_data.get("features", [])
     if features:
-        features_list = "ALL FEATURES IN THIS PROJECT - COMPLETE LIST:\n\n"
-        features_list += f"Total number of features: {len(features)}\n\n"
-        features_list += "FEATURE TITLES:\n"
-        for i, feature in enumerate(features, 1):
-            features_list += f"{i}. {feature.get('title', 'Unnamed Feature')} (Priority: {feature.get('priority', 'N/A')}, Status: {feature.get('status', 'N/A')})\n"
-        features_list += f"\n===== END OF FEATURES LIST =====\n"
-        features_list += f"Total Features: {len(features)}\n"
+        header = (
+            "ALL FEATURES IN THIS PROJECT - COMPLETE LIST:\n\n"
+            f"Total number of features: {len(features)}\n\n"
+            "FEATURE TITLES:"
+        )
+        footer = (
+            "\n===== END OF FEATURES LIST =====\n"
+            f"Total Features: {len(features)}\n"
+        )
         
         documents.append(Document(
-            page_content=features_list,
+            page_content="\n".join([header, _format_title_list(features, 'Unnamed Feature'), footer]),
             metadata={
                 "source": "Features List",
                 "type": "features_list", 
@@ -122,74 +597,52 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
         ))
     
     # 4. Individual Module Chunks (Each module with its user stories and features)
+    # Index stories by module and features by story once, instead of filtering per module/story
+    stories_by_module = defaultdict(list)
+    for story in user_stories:
+        stories_by_module[story.get('module_id')].append(story)
+    features_by_story = defaultdict(list)
+    for feature in features:
+        features_by_story[feature.get('user_story_id')].append(feature)
     
-    for module in modules:
-        module_id = module.get('id')
-        module_name = module.get('module_name', 'Unnamed Module')
-        
-        # Build module chunk with nested data
-        chunk_content = f"Module: {module_name}\n"
-        chunk_content += f"Description: {module.get('description', 'N/A')}\n"
-        chunk_content += f"Priority: {module.get('priority', 'N/A')}\n"
-        chunk_content += f"Business Impact: {module.get('business_impact', 'N/A')}\n\n"
-        
-        # Get user stories for this module
-        module_stories = [us for us in user_stories if us.get('module_id') == module_id]
-        
-        if module_stories:
-            chunk_content += f"User Stories ({len(module_stories)} total):\n"
-            for story in module_stories:
-                story_id = story.get('id')
-                chunk_content += f"\n  • {story.get('title', 'N/A')}\n"
-                chunk_content += f"    Role: {story.get('user_role', 'N/A')}\n"
-                chunk_content += f"    Description: {story.get('description', 'N/A')}\n"
-                chunk_content += f"    Priority: {story.get('priority', 'N/A')}, Status: {story.get('status', 'N/A')}\n"
-                
-                # Get features for this user story
-                story_features = [f for f in features if f.get('user_story_id') == story_id]
-                if story_features:
-                    chunk_content += f"    Features:\n"
-                    for feature in story_features:
-                        chunk_content += f"      - {feature.get('title', 'N/A')} (Priority: {feature.get('priority', 'N/A')}, Status: {feature.get('status', 'N/A')})\n"
-        else:
-            chunk_content += "User Stories: None defined yet\n"
-        
-        # Create chunk for this module
-        documents.append(Document(
-            page_content=chunk_content,
-            metadata={"source": "Module Detail", "module_name": module_name, "module_id": module_id}
-        ))
+    documents.extend(
+        part
+        for module in modules
+        for part in _build_module_parts(module, stories_by_module.get(module.get('id'), ()), features_by_story)
+    )
     
     # 5. Project Overview (Single Chunk)
     project_info = project_data.get("project_information", {})
     project = project_data.get("project", {})
     if project_info or project:
-        overview_content = "Project Overview:\n\n"
+        parts = ["Project Overview:\n\n"]
         if project:
-            overview_content += f"Project Name: {project.get('name', 'N/A')}\n"
-            overview_content += f"Application Type: {project.get('application_type', 'N/A')}\n\n"
+            parts.append(f"Project Name: {project.get('name', 'N/A')}\n")
+            parts.append(f"Application Type: {project.get('application_type', 'N/A')}\n\n")
         if project_info:
-            overview_content += f"Vision: {project_info.get('vision', 'N/A')}\n"
-            overview_content += f"Purpose: {project_info.get('purpose', 'N/A')}\n"
-            overview_content += f"Objectives: {project_info.get('objectives', 'N/A')}\n"
-            overview_content += f"Functional Requirements: {project_info.get('functional_requirements', 'N/A')}\n"
-            overview_content += f"Non-Functional Requirements: {project_info.get('non_functional_requirements', 'N/A')}\n"
+            parts.append(f"Vision: {project_info.get('vision', 'N/A')}\n")
+            parts.append(f"Purpose: {project_info.get('purpose', 'N/A')}\n")
+            parts.append(f"Objectives: {project_info.get('objectives', 'N/A')}\n")
+            parts.append(f"Functional Requirements: {project_info.get('functional_requirements', 'N/A')}\n")
+            parts.append(f"Non-Functional Requirements: {project_info.get('non_functional_requirements', 'N/A')}\n")
         
         documents.append(Document(
-            page_content=overview_content,
+            page_content="".join(parts),
             metadata={"source": "Project Overview", "type": "overview"}
         ))
     
     # 6. Global Business Rules (Project-level rules, distinct from feature-specific rules)
     business_rules = project_data.get("business_rules", {})
     if business_rules:
-        rules_content = "GLOBAL BUSINESS RULES (Project-level Rules):\n\n"
-        rules_content += "Note: These are project-wide business rules that apply across modules, distinct from feature-specific business rules.\n\n"
+        parts = [
+            "GLOBAL BUSINESS RULES (Project-level Rules):\n\n",
+            "Note: These are project-wide business rules that apply across modules, distinct from feature-specific business rules.\n\n",
+        ]
         
         # Debug: Print the structure to understand the data
-        if DEBUG_MODE:
-            print("DEBUG - Business Rules Structure:")
-            print(json.dumps(business_rules, indent=2)[:500])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("DEBUG - Business Rules Structure:")
+            logger.debug("%s", _json_preview(business_rules, 500))
         
         # Check for the actual structure with categories at the root level or in config
         categories = []
@@ -206,29 +659,28 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
         if categories:
             for category in categories:
                 if isinstance(category, dict):
-                    rule_id = category.get('id', '')
                     rule_name = category.get('name', 'Rule')
                     rule_desc = category.get('description', '')
                     applicable_modules = category.get('applicableTo', [])
                     
-                    rules_content += f"• {rule_name}:\n"
+                    parts.append(f"• {rule_name}:\n")
                     if rule_desc:
-                        rules_content += f"  {rule_desc}\n"
+                        parts.append(f"  {rule_desc}\n")
                     
                     if applicable_modules and len(applicable_modules) > 0:
-                        rules_content += f"  📍 Applicable to: {', '.join(applicable_modules)}\n"
+                        parts.append(f"  📍 Applicable to: {', '.join(applicable_modules)}\n")
                     else:
-                        rules_content += f"  📍 Applicable to: All modules\n"
-                    rules_content += "\n"
+                        parts.append("  📍 Applicable to: All modules\n")
+                    parts.append("\n")
         
         # Add a summary at the end if we have rules
         if categories and len(categories) > 0:
-            rules_content += f"\nTotal Global Business Rules: {len(categories)}\n"
+            parts.append(f"\nTotal Global Business Rules: {len(categories)}\n")
         
-        rules_content += "\nNote: Individual features may have their own specific business rules. Check feature details for feature-level rules.\n"
+        parts.append("\nNote: Individual features may have their own specific business rules. Check feature details for feature-level rules.\n")
         
         documents.append(Document(
-            page_content=rules_content,
+            page_content="".join(parts),
             metadata={"source": "Global Business Rules", "type": "global_rules", "keywords": "business rules, global rules, project rules"}
         ))
     
@@ -236,153 +688,260 @@ def create_document_chunks(project_data: Dict) -> List[Document]:
     tech_stack = project_data.get("tech_stack", {})
     if tech_stack:
         actual_stack = tech_stack.get('tech_stack', tech_stack) if isinstance(tech_stack, dict) else tech_stack
-        tech_content = "Technology Stack:\n\n"
+        parts = ["Technology Stack:\n\n"]
         
         if isinstance(actual_stack, dict):
             for category, technologies in actual_stack.items():
-                tech_content += f"{category}:\n"
+                parts.append(f"{category}:\n")
                 if isinstance(technologies, list):
                     for tech in technologies:
-                        tech_content += f"  • {tech}\n"
+                        parts.append(f"  • {tech}\n")
                 else:
-                    tech_content += f"  • {technologies}\n"
-                tech_content += "\n"
+                    parts.append(f"  • {technologies}\n")
+                parts.append("\n")
         
         documents.append(Document(
-            page_content=tech_content,
+            page_content="".join(parts),
             metadata={"source": "Tech Stack", "type": "technology"}
         ))
     
     # 8. UI/UX Guidelines (Single Chunk)
     uiux = project_data.get("uiux_guidelines", {})
     if uiux:
-        uiux_content = "UI/UX Guidelines:\n\n"
         guidelines = uiux.get('guidelines', 'No guidelines defined yet')
-        uiux_content += guidelines
         
         documents.append(Document(
-            page_content=uiux_content,
+            page_content="UI/UX Guidelines:\n\n" + guidelines,
             metadata={"source": "UI/UX Guidelines", "type": "design"}
         ))
     
     
     return documents
 
-def initialize_rag(project_id: str, project_data: Dict) -> None:
+def _create_faiss_index(vectors: np.ndarray) -> faiss.Index:
     """
-    Initialize RAG system with project data.
-    Creates or loads vector store and RAG chain.
+    Creates and fills the FAISS index for a project's chunk vectors:
+    HNSW over int8 scalar-quantized vectors, or IVF over the same codes for large projects (sub-linear scans).
     """
-    global _vector_store, _rag_chain, _embeddings, _current_project_id
-    
-    # Load .env from Backend directory
-    env_path = os.path.join(_backend_root, '.env')
-    load_dotenv(env_path)
+    dim = vectors.shape[1]
     
-    if not os.getenv("OPENROUTER_API_KEY"):
-        raise ValueError("OPENROUTER_API_KEY not found in environment")
+    if len(vectors) > IVF_MIN_CHUNKS:
+        nlist = max(4, min(int(math.sqrt(len(vectors))), len(vectors) // IVF_MIN_POINTS_PER_LIST))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        index.nprobe = IVF_NPROBE
+    else:
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
     
-    # Check if we need to reinitialize (different project or embeddings changed)
-    if _current_project_id == project_id and _vector_store is not None and _embeddings is not None:
-        # Check if we're using a different embedding model
-        if not hasattr(_embeddings, '_model_changed'):
-            return  # Already initialized for this project
+    # Learns the IVF centroids (if any) and the per-dimension range for the 8-bit quantizer
+    index.train(vectors)
+    index.add(vectors)
+    _enable_reconstruct(index)
+    return index
+
+def _enable_reconstruct(index: faiss.Index) -> None:
+    """
+    MMR retrieval reconstructs the candidate vectors by id; IVF indexes need a direct map for that.
+    The map is saved with the index, so this only does work for indexes written without one.
+    """
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.no():
+        index.make_direct_map()
+
+def _build_vector_store(documents: List[Document]) -> FAISS:
+    """
+    Embeds all chunk texts in one batched call and builds an inner-product FAISS store.
+    Only chunks missing from the persistent embedding cache are sent to the model.
+    """
+    texts = [d.page_content for d in documents]
+    vectors = np.asarray(_document_embeddings.embed_documents(texts), dtype='float32')
+    index = _create_faiss_index(vectors)
     
-    _current_project_id = project_id
+    ids = [str(uuid.uuid4()) for _ in documents]
+    return FAISS(
+        embedding_function=_query_embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, documents))),
+        index_to_docstore_id=dict(enumerate(ids)),
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+def _save_vector_store(vector_store: FAISS, db_path: str) -> str:
+    """
+    Saves the vector store into a new build directory inside db_path and returns its name.
+    The directory appears (by rename) only once complete and is never modified, so with the manifest
+    naming it, index.faiss is always loaded together with the index.pkl saved alongside it.
+    """
+    tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=db_path)
+    index_dir = f"{INDEX_DIR_PREFIX}{uuid.uuid4().hex}"
+    try:
+        vector_store.save_local(folder_path=tmp_path)
+        os.rename(tmp_path, os.path.join(db_path, index_dir))
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return index_dir
+
+def _remove_old_builds(db_path: str, keep: Tuple[Optional[str], ...]) -> None:
+    """
+    Deletes superseded build directories and index files saved before builds were versioned.
+    The previous build is passed in `keep`, so a worker that read the old manifest can still open it;
+    workers that already mapped an older index keep reading it after deletion (the inode lives on).
+    """
+    for name in os.listdir(db_path):
+        path = os.path.join(db_path, name)
+        try:
+            if name.startswith(INDEX_DIR_PREFIX) and name not in keep:
+                shutil.rmtree(path)
+            elif name in ("index.faiss", "index.pkl"):
+                os.remove(path)
+        except OSError:
+            pass  # Already removed by another worker
+
+def _mmap_io_flags(index_path: str) -> int:
+    """
+    Picks the faiss read flags that memory-map this index type: IO_FLAG_MMAP maps only IVF
+    inverted lists, IO_FLAG_MMAP_IFC maps flat/scalar-quantized code arrays (the vectors behind HNSW).
+    """
+    with open(index_path, "rb") as f:
+        fourcc = f.read(4)
+    # IVF index files start with an "Iw.." fourcc (IwSQ, IwPQ, IwFl, ...)
+    if fourcc.startswith(b"Iw"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+def _load_vector_store(build_path: str) -> FAISS:
+    """
+    Loads a build directory written by _save_vector_store, memory-mapping the FAISS index's vector data read-only
+    so only the pages touched by queries become resident. The HNSW graph links are read into memory.
+    """
+    index_path = os.path.join(build_path, "index.faiss")
+    try:
+        index = faiss.read_index(index_path, _mmap_io_flags(index_path))
+    except RuntimeError:
+        # faiss could not map this file; read it fully into memory instead
+        index = faiss.read_index(index_path)
+    _enable_reconstruct(index)
     
-    # 1. Create document chunks
-    documents = create_document_chunks(project_data)
+    # index.pkl holds the docstore and FAISS id -> docstore id mapping written by save_local
+    with open(os.path.join(build_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
     
-    if not documents:
-        raise ValueError("No documents created from project data")
+    return FAISS(
+        embedding_function=_query_embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+def _upcast_token_embeddings(module, inputs, features: Dict) -> Dict:
+    """Forward hook on the transformer: pooling and normalization then run in fp32 instead of bf16/fp16."""
+    features["token_embeddings"] = features["token_embeddings"].float()
+    return features
+
+def _load_embeddings() -> None:
+    """
+    Loads the embedding model once.
+    Safe to call from several threads: later callers wait for the first load to finish.
+    """
+    global _embeddings, _query_embeddings, _document_embeddings
     
-    # Debug: Print created chunks
-    if DEBUG_MODE:
-        print("\n" + "="*80)
-        print("📦 INITIALIZING RAG - CHUNKS CREATED:")
-        print("="*80)
-        print(f"Total chunks created: {len(documents)}")
-        print("-"*40)
+    with _embeddings_lock:
+        if _embeddings is not None:
+            return
         
-        for i, doc in enumerate(documents, 1):
-            print(f"\nChunk {i}:")
-            print(f"  Source: {doc.metadata.get('source', 'Unknown')}")
-            if 'module_name' in doc.metadata:
-                print(f"  Module: {doc.metadata['module_name']}")
-            if 'type' in doc.metadata:
-                print(f"  Type: {doc.metadata['type']}")
-            print(f"  Size: {len(doc.page_content)} characters")
-            # Show first 200 chars for initialization (full content would be too much for all chunks)
-            preview = doc.page_content[:200] + ("..." if len(doc.page_content) > 200 else "")
-            print(f"  Preview: {preview}")
-        
-        print("\n" + "="*80)
-        print(f"✅ RAG initialized with {len(documents)} chunks")
-        print("="*80 + "\n")
-    else:
-        print(f"✅ RAG initialized with {len(documents)} chunks")
-    
-    # 2. Initialize embeddings
-    if _embeddings is None:
-        # Nomic embeddings require trust_remote_code
-        model_kwargs = {
-            'device': 'cpu',
-            'trust_remote_code': True  # Required for nomic-embed
-        }
-        encode_kwargs = {'normalize_embeddings': True}
-        
-        print(f"Loading embedding model: {EMBEDDING_MODEL}")
-        print("Note: First time loading may take a few minutes to download the model...")
-        
-        _embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs=model_kwargs,
-            encode_kwargs=encode_kwargs
-        )
+        load_dotenv(os.path.join(_backend_root, '.env'))
+        # Optional directory with an int8 ONNX export of EMBEDDING_MODEL (see rag/onnx_embeddings.py)
+        onnx_model_dir = os.getenv("RAG_ONNX_MODEL_DIR")
         
-        print("✅ Embedding model loaded successfully")
-    
-    # 3. Create or load vector store (project-specific)
-    # Ensure DB_DIR exists
-    os.makedirs(DB_DIR, exist_ok=True)
-    db_path = os.path.join(DB_DIR, project_id)
-    os.makedirs(db_path, exist_ok=True)
-    
-    # Force rebuild if embedding model changed or if specified
-    force_rebuild = os.getenv("RAG_FORCE_REBUILD", "false").lower() == "true"
-    
-    if os.path.exists(os.path.join(db_path, "index.faiss")) and not force_rebuild:
-        try:
-            print("Loading existing vector store...")
-            _vector_store = FAISS.load_local(
-                folder_path=db_path,
-                embeddings=_embeddings,
-                allow_dangerous_deserialization=True
-            )
-            print("✅ Vector store loaded from cache")
-        except Exception as e:
-            print(f"⚠️ Failed to load vector store: {e}")
-            print("Rebuilding vector store with new embeddings...")
-            _vector_store = FAISS.from_documents(
-                documents=documents,
-                embedding=_embeddings
+        if onnx_model_dir:
+            logger.info("Loading quantized ONNX embedding model from: %s", onnx_model_dir)
+            embeddings = OnnxEmbeddings(onnx_model_dir, batch_size=EMBEDDING_BATCH_SIZE)
+        else:
+            # Nomic embeddings require trust_remote_code
+            model_kwargs = {
+                'device': 'cpu',
+                'trust_remote_code': True  # Required for nomic-embed
+            }
+            encode_kwargs = {
+                'batch_size': EMBEDDING_BATCH_SIZE,
+                'normalize_embeddings': True
+            }
+            
+            # Use the GPU when available, loading the weights natively in bf16 (Ampere+) or fp16
+            if torch.cuda.is_available():
+                dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                model_kwargs['device'] = 'cuda'
+                model_kwargs['model_kwargs'] = {'torch_dtype': dtype}
+                encode_kwargs['batch_size'] = EMBEDDING_BATCH_SIZE_GPU
+                logger.info("Using CUDA for embeddings (%s)", dtype)
+            else:
+                # Let the CPU encoder use every core (RAG_TORCH_THREADS overrides)
+                torch.set_num_threads(int(os.getenv("RAG_TORCH_THREADS", os.cpu_count() or 1)))
+            
+            logger.info("Loading embedding model: %s", EMBEDDING_MODEL)
+            logger.info("Note: First time loading may take a few minutes to download the model...")
+            
+            embeddings = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL,
+                model_kwargs=model_kwargs,
+                encode_kwargs=encode_kwargs,
+                show_progress=False
             )
-            _vector_store.save_local(folder_path=db_path)
-            print("✅ Vector store rebuilt and saved")
-    else:
-        print("Building new vector store...")
-        _vector_store = FAISS.from_documents(
-            documents=documents,
-            embedding=_embeddings
+            if model_kwargs['device'] == 'cuda':
+                # Mean pooling sums up to 8192 token vectors; in bf16 that loses most of the mantissa
+                embeddings._client[0].register_forward_hook(_upcast_token_embeddings)
+        _query_embeddings = _QueryCachedEmbeddings(embeddings)
+        _document_embeddings = CacheBackedEmbeddings.from_bytes_store(
+            embeddings,
+            LocalFileStore(EMBEDDING_CACHE_DIR),
+            namespace=_embedding_cache_namespace(embeddings),
+            key_encoder="sha256"
         )
-        _vector_store.save_local(folder_path=db_path)
-        print("✅ Vector store created and saved")
-    
-    # 4. Create retriever with optimized k value (3 most relevant chunks)
-    retriever = _vector_store.as_retriever(search_kwargs={"k": 3})
+        _embeddings = embeddings
+        
+        logger.info("✅ Embedding model loaded successfully")
+
+def _prewarm_embeddings() -> None:
+    """
+    Loads the embedding model and runs one warmup encode, so the first real request
+    doesn't pay for lazy initialization (kernel selection, CUDA context, remote code imports).
+    """
+    try:
+        _load_embeddings()
+        _embeddings.embed_query("warmup")
+        logger.info("✅ Embedding model warmed up")
+    except Exception as e:
+        # initialize_rag retries the load and surfaces the error to the caller
+        logger.warning("⚠️ Background embedding model load failed: %s", e)
+
+def start_embeddings_warmup() -> threading.Thread:
+    """
+    Starts loading and warming up the embedding model in a background thread,
+    so the first initialize_rag call doesn't pay the model download/load time.
+    """
+    thread = threading.Thread(target=_prewarm_embeddings, name="rag-embeddings-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def _get_rag_chain():
+    """
+    Returns the shared RAG chain (prompt | LLM | output parser), creating it on first use.
+    Retrieval happens once in query_rag, the chain takes the formatted context.
+    """
+    global _rag_chain
     
-    # 5. Initialize LLM
-    llm = ChatOpenAI(
+    with _rag_chain_lock:
+        if _rag_chain is None:
+            _rag_chain = RAG_PROMPT | _create_llm() | _OUTPUT_PARSER
+        return _rag_chain
+
+def _create_llm() -> ChatOpenAI:
+    return ChatOpenAI(
         model_name=OPENROUTER_MODEL,
         openai_api_key=os.getenv("OPENROUTER_API_KEY"),
         openai_api_base="https://openrouter.ai/api/v1",
@@ -390,160 +949,311 @@ def initialize_rag(project_id: str, project_data: Dict) -> None:
             "HTTP-Referer": "http://localhost:3000",
             "X-Title": "Vibe Engineer RAG"
         },
-        temperature=0.7
+        temperature=0.7,
+        streaming=True
     )
+
+def _load_env() -> None:
+    # Load .env from Backend directory
+    env_path = os.path.join(_backend_root, '.env')
+    load_dotenv(env_path)
     
-    # 6. Create RAG chain
-    template = """You are an expert project assistant for a software development team. 
-Answer the user's question based on the following project context.
+    if not os.getenv("OPENROUTER_API_KEY"):
+        raise ValueError("OPENROUTER_API_KEY not found in environment")
 
-IMPORTANT INSTRUCTIONS:
-- If asked to list ALL modules or module names, look for the "MODULE LIST OVERVIEW" or "ALL MODULES IN THIS PROJECT" section
-- When you see "Total Modules: X", ensure your answer includes exactly X modules
-- For listing questions, use the dedicated list chunks that contain complete lists
-- If asked for details about a specific module, use the individual module chunks
-- Always provide the COMPLETE list when asked for "all" items
-- If the context contains a "Quick List of Module Names" section, use it for module name questions
-- Distinguish between "Global Business Rules" (project-level) and feature-specific business rules
-- When discussing business rules, mention which modules they apply to if specified
+def _create_project_state(vector_store: FAISS, project_hash: str,
+                          quick_answers: Dict[str, str]) -> _ProjectState:
+    # Retriever is built once per loaded project and reused by every query
+    retriever = vector_store.as_retriever(
+        search_type="mmr",
+        search_kwargs={"k": RETRIEVER_K, "fetch_k": RETRIEVER_FETCH_K, "lambda_mult": RETRIEVER_LAMBDA_MULT}
+    )
+    return _ProjectState(vector_store, retriever, _get_rag_chain(), project_hash, quick_answers)
 
-<context>
-{context}
-</context>
+def _set_project_state(project_id: str, state: _ProjectState) -> None:
+    """Stores a loaded project as most recently used and evicts the least recently used ones."""
+    with _projects_lock:
+        _projects[project_id] = state
+        _projects.move_to_end(project_id)
+        evicted_ids = []
+        while len(_projects) > MAX_LOADED_PROJECTS:
+            evicted_ids.append(_projects.popitem(last=False)[0])
+    
+    if evicted_ids:
+        # The semantic answer cache is per project too; it is re-seeded when the project is reloaded
+        with _answer_cache_lock:
+            for evicted_id in evicted_ids:
+                _question_indexes.pop(evicted_id, None)
+    
+    for evicted_id in evicted_ids:
+        logger.info("♻️ Unloaded project %s from memory (saved index is kept on disk)", evicted_id)
 
-Question: {question}
+def _touch_project(project_id: str) -> Optional[_ProjectState]:
+    """Returns the project's loaded state (if any) and marks it most recently used."""
+    with _projects_lock:
+        state = _projects.get(project_id)
+        if state is not None:
+            _projects.move_to_end(project_id)
+        return state
 
-Answer:"""
+def _get_project_state(project_id: str) -> Optional[_ProjectState]:
+    """
+    Returns the loaded state for a project, reloading its saved index if it was evicted.
+    """
+    state = _touch_project(project_id)
+    if state is not None:
+        return state
     
-    prompt = ChatPromptTemplate.from_template(template)
+    db_path = os.path.join(DB_DIR, project_id)
+    manifest = _read_manifest(db_path)
+    if manifest is None:
+        return None
     
-    def format_docs(docs):
-        return "\n\n---\n\n".join([d.page_content for d in docs])
+    _load_env()
+    _load_embeddings()
+    if not _has_saved_index(db_path, manifest):
+        return None
     
-    _rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
+    logger.info("Reloading saved vector store for project %s...", project_id)
+    state = _create_project_state(
+        _load_vector_store(os.path.join(db_path, manifest["index_dir"])),
+        manifest["hash"], manifest.get("quick_answers", {})
     )
+    _set_project_state(project_id, state)
+    _seed_similar_answers(project_id, state.project_hash, state.quick_answers)
+    return state
 
-def query_rag(question: str) -> str:
+def initialize_rag(project_id: str, project_data: Dict) -> None:
     """
-    Query the RAG system with a question.
+    Initialize RAG system with project data.
+    Creates or loads the project's vector store and RAG chain.
     """
-    global _rag_chain, _vector_store
+    _load_env()
     
-    if _rag_chain is None:
-        raise ValueError("RAG system not initialized. Call initialize_rag() first.")
+    project_hash = _project_hash(project_data)
     
-    try:
-        if DEBUG_MODE:
-            # Debug: Retrieve and print chunks
-            print("\n" + "="*80)
-            print(f"🔍 QUERY: {question}")
-            print("="*80)
-            
-            # Get the retriever and fetch documents
-            retriever = _vector_store.as_retriever(search_kwargs={"k": 3})
-            
-            # Try different method names for compatibility
-            try:
-                retrieved_docs = retriever.invoke(question)
-            except AttributeError:
-                try:
-                    retrieved_docs = retriever.get_relevant_documents(question)
-                except AttributeError:
-                    # Fallback: use similarity search directly
-                    retrieved_docs = _vector_store.similarity_search(question, k=3)
-            
-            # Print retrieved chunks for debugging
-            print(f"\n📚 RETRIEVED {len(retrieved_docs)} CHUNKS:")
-            print("-"*80)
+    # Check if we need to reinitialize (not loaded or changed data)
+    state = _touch_project(project_id)
+    if state is not None and state.project_hash == project_hash:
+        return  # Already initialized for this project
+    
+    vector_store = None
+    quick_answers = _build_quick_answers(project_data)
+    
+    # 1. Initialize embeddings (waits for the startup warmup thread if it is still loading)
+    _load_embeddings()
+    
+    # 2. Load the saved vector store (project-specific) if its manifest matches the project data
+    #    and embedding model; chunk creation and embedding are skipped entirely in that case
+    # Ensure DB_DIR exists
+    os.makedirs(DB_DIR, exist_ok=True)
+    db_path = os.path.join(DB_DIR, project_id)
+    os.makedirs(db_path, exist_ok=True)
+    
+    # Force rebuild if specified
+    force_rebuild = os.getenv("RAG_FORCE_REBUILD", "false").lower() == "true"
+    
+    manifest = _read_manifest(db_path)
+    if not force_rebuild and _has_saved_index(db_path, manifest, project_hash):
+        try:
+            logger.info("Loading existing vector store...")
+            vector_store = _load_vector_store(os.path.join(db_path, manifest["index_dir"]))
+            logger.info("✅ Vector store loaded from cache")
+        except Exception as e:
+            logger.warning("⚠️ Failed to load vector store: %s", e)
+            logger.warning("Rebuilding vector store with new embeddings...")
+    
+    # 3. Otherwise create document chunks and build the vector store
+    if vector_store is None:
+        documents = _get_document_chunks(project_hash, project_data)
+        
+        if not documents:
+            raise ValueError("No documents created from project data")
+        
+        # Debug: Print created chunks
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("\n%s", "="*80)
+            logger.debug("📦 INITIALIZING RAG - CHUNKS CREATED:")
+            logger.debug("%s", "="*80)
+            logger.debug("Total chunks created: %d", len(documents))
+            logger.debug("%s", "-"*40)
             
-            for i, doc in enumerate(retrieved_docs, 1):
-                print(f"\n🔖 CHUNK {i}:")
-                print(f"   Source: {doc.metadata.get('source', 'Unknown')}")
+            for i, doc in enumerate(documents, 1):
+                logger.debug("\nChunk %d:", i)
+                logger.debug("  Source: %s", doc.metadata.get('source', 'Unknown'))
                 if 'module_name' in doc.metadata:
-                    print(f"   Module: {doc.metadata['module_name']}")
+                    logger.debug("  Module: %s", doc.metadata['module_name'])
                 if 'type' in doc.metadata:
-                    print(f"   Type: {doc.metadata['type']}")
-                print(f"   Length: {len(doc.page_content)} characters")
-                print(f"\n   === COMPLETE CHUNK CONTENT ===")
-                print("   " + doc.page_content.replace('\n', '\n   '))
-                print(f"   === END OF CHUNK ===")
-                print("-"*40)
-            
-            # Calculate total tokens (rough estimate: 1 token ≈ 4 characters)
-            total_chars = sum(len(doc.page_content) for doc in retrieved_docs)
-            estimated_tokens = total_chars // 4
-            print(f"\n📊 TOTAL CHARACTERS: {total_chars}")
-            print(f"📊 ESTIMATED TOKENS: ~{estimated_tokens}")
-            print("="*80 + "\n")
-        
-        # Format the context that will be sent to LLM
-        if DEBUG_MODE:
-            # Get the formatted context
-            retriever = _vector_store.as_retriever(search_kwargs={"k": 3})
-            try:
-                docs = retriever.invoke(question)
-            except AttributeError:
-                try:
-                    docs = retriever.get_relevant_documents(question)
-                except AttributeError:
-                    docs = _vector_store.similarity_search(question, k=3)
-            
-            # Format documents the same way the chain does
-            formatted_context = "\n\n---\n\n".join([d.page_content for d in docs])
+                    logger.debug("  Type: %s", doc.metadata['type'])
+                logger.debug("  Size: %d characters", len(doc.page_content))
+                # Show first 200 chars for initialization (full content would be too much for all chunks)
+                preview = doc.page_content[:200] + ("..." if len(doc.page_content) > 200 else "")
+                logger.debug("  Preview: %s", preview)
             
-            # Build the complete prompt that goes to LLM
-            complete_prompt = f"""You are an expert project assistant for a software development team. 
-Answer the user's question based on the following project context.
+            logger.debug("\n%s", "="*80)
+        logger.info("✅ RAG initialized with %d chunks", len(documents))
+        
+        logger.info("Building new vector store...")
+        vector_store = _build_vector_store(documents)
+        index_dir = _save_vector_store(vector_store, db_path)
+        _write_manifest(db_path, project_hash, len(documents), quick_answers, index_dir)
+        _remove_old_builds(db_path, keep=(index_dir, manifest.get("index_dir") if manifest else None))
+        logger.info("✅ Vector store created and saved")
+    
+    # 4. Create RAG chain and register the project as most recently used
+    _set_project_state(project_id, _create_project_state(vector_store, project_hash, quick_answers))
+    _seed_similar_answers(project_id, project_hash, quick_answers)
 
-IMPORTANT INSTRUCTIONS:
-- If asked to list ALL modules or module names, look for the "MODULE LIST OVERVIEW" or "ALL MODULES IN THIS PROJECT" section
-- When you see "Total Modules: X", ensure your answer includes exactly X modules
-- For listing questions, use the dedicated list chunks that contain complete lists
-- If asked for details about a specific module, use the individual module chunks
-- Always provide the COMPLETE list when asked for "all" items
-- If the context contains a "Quick List of Module Names" section, use it for module name questions
-- Distinguish between "Global Business Rules" (project-level) and feature-specific business rules
-- When discussing business rules, mention which modules they apply to if specified
+def _require_project_state(project_id: str) -> _ProjectState:
+    state = _get_project_state(project_id)
+    if state is None:
+        raise ValueError("RAG system not initialized for this project. Call initialize_rag() first.")
+    return state
 
-<context>
-{formatted_context}
-</context>
+def _lookup_answer(state: _ProjectState, project_id: str,
+                   question: str) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    Looks the question up in the quick answers and the answer cache.
+    Returns (answer, None) on a hit, otherwise (None, question embedding) for caching the new answer.
+    """
+    # Answer simple listing/count questions straight from project data
+    answer = state.quick_answers.get(_normalize_question(question))
+    if answer is not None:
+        logger.info("⚡ Answered directly from project data")
+        return answer, None
+    
+    # Serve repeated questions from the answer cache (exact match, then near-identical question)
+    answer = _get_cached_answer(project_id, state.project_hash, question)
+    if answer is not None:
+        logger.info("⚡ Answer served from cache (exact match)")
+        return answer, None
+    
+    question_vector = _query_embeddings.embed_query(question)
+    answer = _get_similar_answer(project_id, state.project_hash, question_vector)
+    if answer is not None:
+        logger.info("⚡ Answer served from cache (similar question)")
+        return answer, None
+    
+    return None, question_vector
 
-Question: {question}
+def _retrieve_context(state: _ProjectState, question: str) -> str:
+    """
+    Retrieves the chunks for a question once and formats them as the LLM context.
+    The question embedding computed for the answer cache is reused via the query embedding cache.
+    """
+    retrieved_docs = state.retriever.invoke(question)
+    formatted_context = _format_docs(retrieved_docs)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        # Debug: Log retrieved chunks
+        logger.debug("\n%s", "="*80)
+        logger.debug("🔍 QUERY: %s", question)
+        logger.debug("%s", "="*80)
+        
+        logger.debug("\n📚 RETRIEVED %d CHUNKS:", len(retrieved_docs))
+        logger.debug("%s", "-"*80)
+        
+        for i, doc in enumerate(retrieved_docs, 1):
+            logger.debug("\n🔖 CHUNK %d:", i)
+            logger.debug("   Source: %s", doc.metadata.get('source', 'Unknown'))
+            if 'module_name' in doc.metadata:
+                logger.debug("   Module: %s", doc.metadata['module_name'])
+            if 'type' in doc.metadata:
+                logger.debug("   Type: %s", doc.metadata['type'])
+            logger.debug("   Length: %d characters", len(doc.page_content))
+            logger.debug("\n   === COMPLETE CHUNK CONTENT ===")
+            logger.debug("   %s", doc.page_content.replace('\n', '\n   '))
+            logger.debug("   === END OF CHUNK ===")
+            logger.debug("%s", "-"*40)
+        
+        # Calculate total tokens (rough estimate: 1 token ≈ 4 characters)
+        total_chars = sum(len(doc.page_content) for doc in retrieved_docs)
+        logger.debug("\n📊 TOTAL CHARACTERS: %d", total_chars)
+        logger.debug("📊 ESTIMATED TOKENS: ~%d", total_chars // 4)
+        logger.debug("%s\n", "="*80)
+        
+        # Build the complete prompt that goes to LLM (only when it is actually logged)
+        user_message = RAG_USER_TEMPLATE.format(context=formatted_context, question=question)
+        complete_prompt = f"[system]\n{RAG_SYSTEM_PROMPT}\n\n[user]\n{user_message}"
+        
+        logger.debug("\n%s", "="*80)
+        logger.debug("🤖 COMPLETE INPUT TO LLM:")
+        logger.debug("%s", "="*80)
+        logger.debug("Model: %s (via OpenRouter)", OPENROUTER_MODEL)
+        logger.debug("Temperature: 0.7")
+        logger.debug("%s", "-"*40)
+        logger.debug("\n--- SYSTEM PROMPT + FORMATTED CONTEXT + QUESTION ---\n")
+        logger.debug("%s", complete_prompt)
+        logger.debug("\n--- END OF LLM INPUT ---")
+        logger.debug("\nTotal LLM input length: %d characters", len(complete_prompt))
+        logger.debug("Estimated tokens for LLM input: ~%d", len(complete_prompt) // 4)
+        logger.debug("%s\n", "="*80)
+    
+    return formatted_context
 
-Answer:"""
-            
-            print("\n" + "="*80)
-            print("🤖 COMPLETE INPUT TO LLM:")
-            print("="*80)
-            print(f"Model: {OPENROUTER_MODEL} (via OpenRouter)")
-            print(f"Temperature: 0.7")
-            print("-"*40)
-            print("\n--- SYSTEM PROMPT + FORMATTED CONTEXT + QUESTION ---\n")
-            print(complete_prompt)
-            print("\n--- END OF LLM INPUT ---")
-            print(f"\nTotal LLM input length: {len(complete_prompt)} characters")
-            print(f"Estimated tokens for LLM input: ~{len(complete_prompt) // 4}")
-            print("="*80 + "\n")
-        
-        # Now invoke the chain with the question
-        answer = _rag_chain.invoke(question)
-        
-        if DEBUG_MODE:
-            # Print complete answer
-            print(f"✅ COMPLETE ANSWER:")
-            print("-"*40)
-            print(answer)
-            print("-"*40)
-            print(f"Answer length: {len(answer)} characters")
-            print("="*80 + "\n")
+def _finish_answer(project_id: str, state: _ProjectState, question: str,
+                   question_vector: List[float], answer: str) -> None:
+    if logger.isEnabledFor(logging.DEBUG):
+        # Log complete answer
+        logger.debug("✅ COMPLETE ANSWER:")
+        logger.debug("%s", "-"*40)
+        logger.debug("%s", answer)
+        logger.debug("%s", "-"*40)
+        logger.debug("Answer length: %d characters", len(answer))
+        logger.debug("%s\n", "="*80)
+    
+    _cache_answer(project_id, state.project_hash, question, question_vector, answer)
+
+def query_rag(project_id: str, question: str) -> str:
+    """
+    Query the RAG system with a question about a project.
+    """
+    state = _require_project_state(project_id)
+    
+    try:
+        answer, question_vector = _lookup_answer(state, project_id, question)
+        if answer is not None:
+            return answer
         
+        formatted_context = _retrieve_context(state, question)
+        
+        # Now invoke the chain with the already retrieved context
+        answer = state.rag_chain.invoke({"context": formatted_context, "question": question})
+        
+        _finish_answer(project_id, state, question, question_vector, answer)
         return answer
     except Exception as e:
-        print(f"❌ ERROR: {str(e)}")
+        logger.error("❌ ERROR: %s", e)
+        raise Exception(f"Error querying RAG: {str(e)}")
+
+def query_rag_stream(project_id: str, question: str) -> AsyncIterator[str]:
+    """
+    Query the RAG system and stream the answer tokens as the LLM generates them.
+    Lookup and retrieval run before returning, so their errors surface before streaming starts.
+    """
+    state = _require_project_state(project_id)
+    
+    try:
+        answer, question_vector = _lookup_answer(state, project_id, question)
+        if answer is not None:
+            return _astream_text(answer)
+        
+        formatted_context = _retrieve_context(state, question)
+    except Exception as e:
+        logger.error("❌ ERROR: %s", e)
         raise Exception(f"Error querying RAG: {str(e)}")
+    
+    return _astream_answer(project_id, state, question, question_vector, formatted_context)
 
+async def _astream_text(text: str) -> AsyncIterator[str]:
+    yield text
+
+async def _astream_answer(project_id: str, state: _ProjectState, question: str,
+                          question_vector: List[float], formatted_context: str) -> AsyncIterator[str]:
+    chunks = []
+    async for chunk in state.rag_chain.astream({"context": formatted_context, "question": question}):
+        chunks.append(chunk)
+        yield chunk
+    
+    # Cache only complete answers (a client disconnect stops the generator before this point)
+    _finish_answer(project_id, state, question, question_vector, "".join(chunks))
@@ -3,9 +3,12 @@ FastAPI service for RAG functionality
 This can be run as a separate microservice or called from the main backend
 """
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional
+import json
 import uvicorn
 # Import RAG service from Backend/src/rag
 import sys
@@ -17,7 +20,7 @@ backend_src = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_src))
 
 try:
-    from rag.service import initialize_rag, query_rag
+    from rag.service import initialize_rag, query_rag, query_rag_stream, start_embeddings_warmup
 except ImportError as e:
     print(f"Warning: Could not import RAG service: {e}")
     print("Make sure you're running from the Backend directory")
@@ -34,6 +37,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_embeddings():
+    """Load the embedding model in the background so the first request doesn't wait for it"""
+    start_embeddings_warmup()
+
 class ProjectDataRequest(BaseModel):
     project_id: str
     project_data: Dict
@@ -48,7 +56,8 @@ async def initialize(request: ProjectDataRequest):
     try:
         print(f"Initializing RAG for project: {request.project_id}")
         print(f"Project data keys: {request.project_data.keys()}")
-        initialize_rag(request.project_id, request.project_data)
+        # Index builds and the first embedding model load block for seconds to minutes; keep them off the event loop
+        await run_in_threadpool(initialize_rag, request.project_id, request.project_data)
         return {"success": True, "message": "RAG system initialized"}
     except Exception as e:
         print(f"Error initializing RAG: {e}")
@@ -60,11 +69,27 @@ async def initialize(request: ProjectDataRequest):
 async def query(request: QueryRequest):
     """Query the RAG system"""
     try:
-        answer = query_rag(request.question)
+        answer = await run_in_threadpool(query_rag, request.project_id, request.question)
         return {"success": True, "answer": answer}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _to_sse(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Frames answer chunks as Server-Sent Events (JSON-encoded so newlines are preserved)"""
+    async for chunk in chunks:
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """Query the RAG system and stream the answer as Server-Sent Events"""
+    try:
+        # Question embedding and retrieval are blocking CPU work; keep them off the event loop
+        chunks = await run_in_threadpool(query_rag_stream, request.project_id, request.question)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(_to_sse(chunks), media_type="text/event-stream")
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""